@@ -3,19 +3,25 @@
 from logging import getLogger
 from typing import Optional, Union
 
+from hwdb import Deployment
 from mdb import Address
 from wsgilib import Error, ACCEPT, XML, JSON
 
-from lptlib.client import get_client_by_name, get_client_by_zip_code
+from lptlib import merge
+from lptlib.client import (
+    get_client_by_name,
+    get_client_by_zip_code,
+    get_merge_clients_by_zip_code,
+)
 from lptlib.datastructures import GeoCoordinates, Stops
 from lptlib.clientwrapper import ClientWrapper
+from lptlib.config import FALLBACK_CLIENT
 from lptlib.functions import is_geo_coordinates
 
 
-__all__ = ["get_departures", "get_response"]
+__all__ = ["get_address", "get_client", "get_departures", "get_response"]
 
 
-FALLBACK_CLIENT = "EFA Deutschland"
 LOGGER = getLogger("lptlib")
 Target = Union[Address, str, GeoCoordinates, tuple[float, float]]
 
@@ -26,12 +32,29 @@ def get_fallback_client(name: str = FALLBACK_CLIENT) -> ClientWrapper:
     return get_client_by_name(name)
 
 
-def get_departures_addr(
-    address: Union[Address, str],
-    stops: Optional[int] = None,
-    departures: Optional[int] = None,
-) -> Stops:
-    """Returns departures by address."""
+def get_address(json: dict) -> Address:
+    """Return the address from a request's JSON object."""
+
+    if address_id := json.get("address"):
+        return Address.get(Address.id == address_id)
+
+    if deployment_id := json.get("deployment"):
+        deployment = (
+            Deployment.select(cascade=True).where(Deployment.id == deployment_id).get()
+        )
+        return deployment.lpt_address or deployment.address
+
+    return Address(
+        street=json["street"],
+        house_number=json["houseNumber"],
+        zip_code=json["zipCode"],
+        city=json["city"],
+        district=json.get("district"),
+    )
+
+
+def get_client(address: Union[Address, str]) -> tuple[int, ClientWrapper]:
+    """Returns the ZIP code and the respective client for the address."""
 
     try:
         zip_code = int(address.zip_code)
@@ -46,6 +69,25 @@ def get_departures_addr(
         LOGGER.warning('No API for ZIP code "%s" - using fallback client.', zip_code)
         client = get_fallback_client()
 
+    return zip_code, client
+
+
+def get_departures_addr(
+    address: Union[Address, str],
+    stops: Optional[int] = None,
+    departures: Optional[int] = None,
+) -> Stops:
+    """Returns departures by address."""
+
+    zip_code, client = get_client(address)
+
+    if merge_clients := get_merge_clients_by_zip_code(zip_code):
+        clients = [client, *(mc for mc in merge_clients if mc is not client)]
+        LOGGER.info("Merging clients: %s", ", ".join(map(str, clients)))
+        return merge.get_departures(
+            clients, address, stops=stops, departures=departures
+        )
+
     LOGGER.info("Using client: %s", client)
 
     return Stops(
@@ -0,0 +1,249 @@
+"""Command line interface."""
+
+from argparse import ArgumentParser, Namespace
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import ExitStack
+from itertools import chain, zip_longest
+from json import dumps, loads
+from logging import DEBUG, INFO, basicConfig, getLogger
+from os import replace
+from pathlib import Path
+from sys import stdout
+from tempfile import NamedTemporaryFile
+from threading import BoundedSemaphore
+from typing import BinaryIO, Iterable, Iterator, NamedTuple, Optional
+
+from hwdb import Deployment
+from mdb import Address
+
+from lptlib.api import get_address, get_client, get_departures
+from lptlib.client import get_merge_clients_by_zip_code
+from lptlib.config import get_max_departures, get_max_stops
+from lptlib.datastructures import Stops
+from lptlib.ratelimit import Priority, priority
+from lptlib.snapshot import SnapshotWriter
+
+
+__all__ = ["main"]
+
+
+LOG_FORMAT = "[%(levelname)s] %(name)s: %(message)s"
+LOGGER = getLogger("lptlib")
+
+
+class Target(NamedTuple):
+    """A target to export departures for."""
+
+    json: dict
+    address: Address
+    sources: tuple[str, ...]
+
+
+class Result(NamedTuple):
+    """Result of a departure lookup."""
+
+    target: Target
+    stops: Optional[Stops] = None
+    error: Optional[str] = None
+
+    def to_json(self) -> dict:
+        """Returns a JSON-ish dict."""
+        json = {"target": self.target.json, "key": str(self.target.address)}
+
+        if self.stops is None:
+            return {**json, "error": self.error}
+
+        return {**json, "departures": self.stops.to_json()}
+
+
+def get_args() -> Namespace:
+    """Parses the command line arguments."""
+
+    parser = ArgumentParser(description="Local public transport API.")
+    parser.add_argument("-v", "--verbose", action="store_true", help="verbose logging")
+    subparsers = parser.add_subparsers(dest="action", required=True)
+    export = subparsers.add_parser("export", help="export departures")
+    export.add_argument(
+        "-f",
+        "--file",
+        type=Path,
+        help="JSONL file of request bodies as targets (default: all deployments)",
+    )
+    export.add_argument(
+        "-o", "--output", type=Path, help="output file (default: stdout)"
+    )
+    export.add_argument(
+        "-F",
+        "--format",
+        choices=["jsonl", "snapshot"],
+        default="jsonl",
+        help="output format",
+    )
+    export.add_argument(
+        "-c", "--concurrency", type=int, default=8, help="concurrent lookups"
+    )
+    export.add_argument(
+        "-l",
+        "--per-source",
+        type=int,
+        default=2,
+        help="concurrent lookups per upstream source",
+    )
+    export.add_argument("-s", "--stops", type=int, help="stops per target")
+    export.add_argument("-d", "--departures", type=int, help="departures per stop")
+    return parser.parse_args()
+
+
+def make_target(json: dict, address: Address) -> Optional[Target]:
+    """Creates a target, determining the upstream sources it queries."""
+
+    try:
+        zip_code, client = get_client(address)
+    except Exception as error:  # pylint: disable=W0703
+        LOGGER.error("Skipping %s: %s", json, error)
+        return None
+
+    merge_clients = get_merge_clients_by_zip_code(zip_code)
+    sources = dict.fromkeys([client.source, *(mc.source for mc in merge_clients)])
+    return Target(json, address, tuple(sources))
+
+
+def targets_from_deployments() -> Iterator[Target]:
+    """Yields targets of all deployments."""
+
+    for deployment in Deployment.select(cascade=True):
+        if (address := deployment.lpt_address or deployment.address) is None:
+            continue
+
+        if target := make_target({"deployment": deployment.id}, address):
+            yield target
+
+
+def targets_from_file(path: Path) -> Iterator[Target]:
+    """Yields targets from a JSONL file."""
+
+    with path.open("r", encoding="utf-8") as file:
+        for line in file:
+            if not (line := line.strip()):
+                continue
+
+            json = loads(line)
+
+            try:
+                address = get_address(json)
+            except Exception as error:  # pylint: disable=W0703
+                LOGGER.error("Skipping %s: %s", json, error)
+                continue
+
+            if target := make_target(json, address):
+                yield target
+
+
+def interleave(targets: Iterable[Target]) -> list[Target]:
+    """Orders targets round-robin by primary source, so that
+    the per-source limits do not block all workers.
+    """
+
+    by_source = defaultdict(list)
+
+    for target in targets:
+        by_source[target.sources[0]].append(target)
+
+    return [
+        target
+        for target in chain.from_iterable(zip_longest(*by_source.values()))
+        if target is not None
+    ]
+
+
+def lookup(
+    target: Target,
+    limits: dict[str, BoundedSemaphore],
+    stops: int,
+    departures: int,
+) -> Result:
+    """Looks up the departures of a target in the background."""
+
+    with priority(Priority.BACKGROUND), ExitStack() as stack:
+        # Acquire in a fixed order to prevent deadlocks.
+        for source in sorted(target.sources):
+            stack.enter_context(limits[source])
+
+        try:
+            return Result(
+                target,
+                get_departures(target.address, stops=stops, departures=departures),
+            )
+        except Exception as error:  # pylint: disable=W0703
+            LOGGER.error("Lookup failed for %s: %s", target.json, error)
+            return Result(target, error=str(error))
+
+
+def export(args: Namespace, file: BinaryIO) -> None:
+    """Exports departures of the targets to the file."""
+
+    if args.file is None:
+        targets = interleave(targets_from_deployments())
+    else:
+        targets = interleave(targets_from_file(args.file))
+
+    limits = {
+        source: BoundedSemaphore(args.per_source)
+        for source in {source for target in targets for source in target.sources}
+    }
+    stops = get_max_stops() if args.stops is None else args.stops
+    departures = get_max_departures() if args.departures is None else args.departures
+    LOGGER.info("Exporting %i targets.", len(targets))
+
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        futures = [
+            executor.submit(lookup, target, limits, stops, departures)
+            for target in targets
+        ]
+
+        if args.format == "snapshot":
+            with SnapshotWriter(file) as writer:
+                for future in as_completed(futures):
+                    if (result := future.result()).stops is not None:
+                        writer.write(str(result.target.address), result.stops)
+
+            return
+
+        for future in as_completed(futures):
+            file.write(dumps(future.result().to_json()).encode() + b"\n")
+            file.flush()
+
+
+def export_to(args: Namespace, path: Path) -> None:
+    """Exports departures to a temporary file and atomically
+    replaces the given file with it, once the export is complete.
+    """
+
+    file = NamedTemporaryFile(
+        "wb", dir=path.parent, prefix=f".{path.name}.", delete=False
+    )
+
+    try:
+        with file:
+            export(args, file)
+
+        Path(file.name).chmod(0o644)
+    except BaseException:
+        Path(file.name).unlink()
+        raise
+
+    replace(file.name, path)
+
+
+def main() -> None:
+    """Runs the command line interface."""
+
+    args = get_args()
+    basicConfig(format=LOG_FORMAT, level=DEBUG if args.verbose else INFO)
+
+    if args.action == "export":
+        if args.output is None:
+            export(args, stdout.buffer)
+        else:
+            export_to(args, args.output)
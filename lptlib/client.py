@@ -1,24 +1,50 @@
 """Generic LPT client."""
 
 from __future__ import annotations
-from functools import cache
 from json import load
 from logging import getLogger
 from pathlib import Path
+from threading import Lock
+from typing import NamedTuple, Optional
 
 from hafas import Client as HafasClient
 from trias import Client as TriasClient
 
 from lptlib.clientwrapper import ClientWrapper
+from lptlib.config import get_reload_interval
 from lptlib.hafas import ClientWrapper as HafasClientWrapper
+from lptlib.ratelimit import Scheduler
 from lptlib.trias import ClientWrapper as TriasClientWrapper
+from lptlib.watcher import FileWatcher, get_mtime
 
 
-__all__ = ["get_client_by_name", "get_client_by_zip_code"]
+__all__ = [
+    "Registry",
+    "get_client_by_name",
+    "get_client_by_zip_code",
+    "get_merge_clients_by_zip_code",
+    "get_registry",
+    "reload",
+    "use_config",
+]
 
 
 CLIENTS_CONFIG = Path("/usr/local/etc/lpt.json")
+CONFIG_FILE = CLIENTS_CONFIG
 LOGGER = getLogger("LPT")
+LOCK = Lock()
+REGISTRIES: dict[Path, Registry] = {}
+WATCHERS: dict[Path, FileWatcher] = {}
+
+
+class Registry(NamedTuple):
+    """Snapshot of the clients and ZIP code map of a config file."""
+
+    mtime: Optional[float]
+    configs: dict[str, dict]
+    clients: dict[str, ClientWrapper]
+    map: dict[int, str]
+    merge: dict[int, list[str]]
 
 
 def load_client(config: dict) -> ClientWrapper:
@@ -43,12 +69,20 @@ def load_client(config: dict) -> ClientWrapper:
     else:
         raise ValueError(f"Invalid client type: {type_}.")
 
+    if (rate_limit := config.get("rate_limit")) is not None:
+        scheduler = Scheduler.from_json(rate_limit)
+    else:
+        scheduler = None
+
     return wrapper(
-        client, config["source"], fix_address=config.get("fix_address", False)
+        client,
+        config["source"],
+        fix_address=config.get("fix_address", False),
+        scheduler=scheduler,
+        timeout=config.get("timeout"),
     )
 
 
-@cache
 def load_json(path: Path = CLIENTS_CONFIG) -> dict:
     """Loads the JSON config file."""
 
@@ -60,14 +94,22 @@ def load_json(path: Path = CLIENTS_CONFIG) -> dict:
         return {}
 
 
-@cache
-def load_clients(path: Path = CLIENTS_CONFIG) -> dict[str, ClientWrapper]:
-    """Loads name / client map."""
+def load_clients(
+    json: dict, previous: Optional[Registry] = None
+) -> tuple[dict[str, dict], dict[str, ClientWrapper]]:
+    """Loads name / config and name / client maps.
 
-    json = load_json(path)
-    clients = {}
+    Clients whose config did not change are taken over from the previous
+    registry, so that their connection pools are retained.
+    """
+
+    configs, clients = {}, {}
 
     for name, config in json.get("clients", {}).items():
+        if previous is not None and previous.configs.get(name) == config:
+            configs[name], clients[name] = config, previous.clients[name]
+            continue
+
         LOGGER.info("Loading %s.", name)
 
         try:
@@ -79,14 +121,14 @@ def load_clients(path: Path = CLIENTS_CONFIG) -> dict[str, ClientWrapper]:
             LOGGER.error(value_error)
             continue
 
-    return clients
+        configs[name] = config
 
+    return configs, clients
 
-@cache
-def load_map(path: Path = CLIENTS_CONFIG) -> dict[int, str]:
+
+def load_map(json: dict) -> dict[int, str]:
     """Loads ZIP code / name map."""
 
-    json = load_json(path)
     map_ = {}
 
     for name, zip_codes in json.get("map", {}).items():
@@ -105,13 +147,100 @@ def load_map(path: Path = CLIENTS_CONFIG) -> dict[int, str]:
     return map_
 
 
+def load_merge_map(json: dict) -> dict[int, list[str]]:
+    """Loads ZIP code / names map of additional clients to merge."""
+
+    map_ = {}
+
+    for name, zip_codes in json.get("merge", {}).items():
+        LOGGER.info("Mapping %s for merging.", name)
+
+        for start, end in zip_codes:
+            for zip_code in range(start, end + 1):
+                map_.setdefault(zip_code, []).append(name)
+
+    return map_
+
+
+def load_registry(
+    path: Path = CLIENTS_CONFIG, previous: Optional[Registry] = None
+) -> Registry:
+    """Loads a registry from the given config file."""
+
+    mtime = get_mtime(path)
+    json = load_json(path)
+    configs, clients = load_clients(json, previous)
+    return Registry(mtime, configs, clients, load_map(json), load_merge_map(json))
+
+
+def reload(path: Path = CLIENTS_CONFIG) -> Registry:
+    """Rebuilds the registry and atomically replaces the current one."""
+
+    with LOCK:
+        previous = REGISTRIES.get(path)
+
+        if previous is not None and get_mtime(path) is None:
+            LOGGER.warning('Config file "%s" vanished. Keeping clients.', path)
+            return previous
+
+        LOGGER.info('Reloading config file "%s".', path)
+        registry = REGISTRIES[path] = load_registry(path, previous)
+        return registry
+
+
+def use_config(path: Path) -> None:
+    """Sets the config file used to look up clients."""
+
+    global CONFIG_FILE  # pylint: disable=W0603
+    CONFIG_FILE = path
+
+
+def get_registry(path: Optional[Path] = None) -> Registry:
+    """Returns the current registry, loading it on first access.
+
+    Defaults to the config file set by use_config().
+    """
+
+    if path is None:
+        path = CONFIG_FILE
+
+    if (registry := REGISTRIES.get(path)) is not None:
+        return registry
+
+    with LOCK:
+        if (registry := REGISTRIES.get(path)) is None:
+            registry = REGISTRIES[path] = load_registry(path)
+
+        if path not in WATCHERS and (interval := get_reload_interval()) > 0:
+            WATCHERS[path] = FileWatcher(path, interval, reload, registry.mtime)
+            WATCHERS[path].start()
+
+    return registry
+
+
 def get_client_by_name(name: str) -> ClientWrapper:
     """Returns a client for the given ZIP code."""
 
-    return load_clients()[name]
+    return get_registry().clients[name]
 
 
 def get_client_by_zip_code(zip_code: int) -> ClientWrapper:
     """Returns a client for the given ZIP code."""
 
-    return get_client_by_name(load_map()[zip_code])
+    registry = get_registry()
+    return registry.clients[registry.map[zip_code]]
+
+
+def get_merge_clients_by_zip_code(zip_code: int) -> list[ClientWrapper]:
+    """Returns additional clients to merge departures from for the given ZIP code."""
+
+    registry = get_registry()
+    clients = []
+
+    for name in registry.merge.get(zip_code, []):
+        try:
+            clients.append(registry.clients[name])
+        except KeyError:
+            LOGGER.error("No such client: %s", name)
+
+    return clients
@@ -1,13 +1,15 @@
 """Common client wrapper."""
 
 from __future__ import annotations
-from typing import Iterator, Optional, Union
+from typing import Any, Callable, Iterator, Optional, Union
 
 from hafas import Client as HafasClient
 from mdb import Address
 from trias import Client as TriasClient
 
 from lptlib.datastructures import GeoCoordinates, Stop
+from lptlib.ratelimit import Scheduler
+from lptlib.timing import stage
 
 
 __all__ = ["ClientWrapper"]
@@ -19,15 +21,32 @@ Client = Union[HafasClient, TriasClient]
 class ClientWrapper:
     """A generic local public transport API client."""
 
-    def __init__(self, client: Client, source: str, fix_address: bool = False):
+    def __init__(
+        self,
+        client: Client,
+        source: str,
+        fix_address: bool = False,
+        scheduler: Optional[Scheduler] = None,
+        timeout: Optional[float] = None,
+    ):
         """Sets client and source."""
         self.client = client
         self.source = source
         self.fix_address = fix_address
+        self.scheduler = scheduler
+        self.timeout = timeout
 
     def __str__(self):
         return f"{self.client} {self.source} {self.fix_address}"
 
+    def call(self, function: Callable[..., Any], *args, **kwargs) -> Any:
+        """Calls an upstream API function, rate-limited if configured."""
+        with stage(f"upstream.{function.__name__}"):
+            if self.scheduler is None:
+                return function(*args, **kwargs)
+
+            return self.scheduler.call(function, *args, **kwargs)
+
     def get_departures_geo(
         self,
         geo: GeoCoordinates,
@@ -38,6 +57,10 @@ class ClientWrapper:
         """Yields stops for the given geo coordinates."""
         raise NotImplementedError()
 
+    def address_to_geo(self, address: Union[Address, str]) -> GeoCoordinates:
+        """Converts an address into geo coordinates."""
+        raise NotImplementedError()
+
     def get_departures_addr(
         self,
         address: Union[Address, str],
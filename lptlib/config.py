@@ -1,13 +1,24 @@
 """Configuration file parsing."""
 
 from functools import cache, partial
+from pathlib import Path
+from typing import Optional
 
 from configlib import load_config
 
 
-__all__ = ["get_config", "get_max_stops", "get_max_departures"]
+__all__ = [
+    "FALLBACK_CLIENT",
+    "get_config",
+    "get_max_stops",
+    "get_max_departures",
+    "get_merge_timeout",
+    "get_reload_interval",
+    "get_snapshot_file",
+]
 
 
+FALLBACK_CLIENT = "EFA Deutschland"
 get_config = partial(cache(load_config), "lptlib.conf")
 
 
@@ -21,3 +32,30 @@ def get_max_departures() -> int:
     """Returns the maximum amount of displayed departures per stop."""
 
     return get_config().getint("LPT", "departures", fallback=3)
+
+
+def get_reload_interval() -> float:
+    """Returns the interval in seconds to check lpt.json for changes.
+
+    A non-positive value disables reloading.
+    """
+
+    return get_config().getfloat("LPT", "reload_interval", fallback=10)
+
+
+def get_merge_timeout() -> float:
+    """Returns the default time in seconds to wait for sources when merging.
+
+    This applies if none of the merged clients has a timeout configured.
+    """
+
+    return get_config().getfloat("LPT", "merge_timeout", fallback=10)
+
+
+def get_snapshot_file() -> Optional[Path]:
+    """Returns the path to the departure snapshot file for offline use."""
+
+    if (path := get_config().get("LPT", "snapshot", fallback=None)) is None:
+        return None
+
+    return Path(path)
@@ -1,5 +1,6 @@
 """Common API."""
 
+from __future__ import annotations
 from datetime import datetime
 from typing import Iterable, NamedTuple, Optional
 
@@ -25,6 +26,20 @@ class StopEvent(NamedTuple):
     scheduled: datetime
     estimated: Optional[datetime] = None
 
+    @classmethod
+    def from_json(cls, json: dict) -> StopEvent:
+        """Creates a stop event from a JSON-ish dict."""
+        if (estimated := json.get("estimated")) is not None:
+            estimated = datetime.fromisoformat(estimated)
+
+        return cls(
+            json["type"],
+            json["line"],
+            json["destination"],
+            datetime.fromisoformat(json["scheduled"]),
+            estimated,
+        )
+
     @property
     def estimated_str(self) -> Optional[str]:
         """Returns the estimated datetime string."""
@@ -62,6 +77,16 @@ class Stop(NamedTuple):
     geo: GeoCoordinates
     departures: Iterable[StopEvent]
 
+    @classmethod
+    def from_json(cls, json: dict) -> Stop:
+        """Creates a stop from a JSON-ish dict."""
+        return cls(
+            json["id"],
+            json["name"],
+            GeoCoordinates(*json["geo"]),
+            [StopEvent.from_json(departure) for departure in json["departures"]],
+        )
+
     def to_json(self) -> dict:
         """Returns a JSON-ish dict."""
         return {
@@ -88,6 +113,11 @@ class Stops(NamedTuple):
     stops: list[Stop]
     source: str
 
+    @classmethod
+    def from_json(cls, json: dict) -> Stops:
+        """Creates stops from a JSON-ish dict."""
+        return cls([Stop.from_json(stop) for stop in json["stops"]], json["source"])
+
     def to_json(self) -> dict:
         """Returns a JSON-ish dict."""
         return {"stops": [stop.to_json() for stop in self.stops], "source": self.source}
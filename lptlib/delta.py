@@ -0,0 +1,177 @@
+"""Incremental departure updates for polling clients."""
+
+from collections import OrderedDict
+from hashlib import blake2b
+from threading import Lock
+from typing import Hashable, Optional
+
+from lptlib.datastructures import Stop, StopEvent, Stops
+
+
+__all__ = ["SnapshotStore", "diff", "get_version"]
+
+
+MAX_KEYS = 4096
+MAX_VERSIONS = 8
+
+
+class SnapshotStore:
+    """Stores the most recent versions of departures per request key."""
+
+    def __init__(self, max_keys: int = MAX_KEYS, max_versions: int = MAX_VERSIONS):
+        self.max_keys = max_keys
+        self.max_versions = max_versions
+        self.snapshots: OrderedDict[Hashable, OrderedDict[str, Stops]] = OrderedDict()
+        self.lock = Lock()
+
+    def add(self, key: Hashable, stops: Stops) -> str:
+        """Stores the departures and returns their version."""
+        version = get_version(stops)
+
+        with self.lock:
+            if (versions := self.snapshots.get(key)) is None:
+                versions = self.snapshots[key] = OrderedDict()
+
+            self.snapshots.move_to_end(key)
+            versions[version] = stops
+            versions.move_to_end(version)
+
+            while len(versions) > self.max_versions:
+                versions.popitem(last=False)
+
+            while len(self.snapshots) > self.max_keys:
+                self.snapshots.popitem(last=False)
+
+        return version
+
+    def get(self, key: Hashable, version: str) -> Optional[Stops]:
+        """Returns the departures of the given version if still available."""
+        with self.lock:
+            if (versions := self.snapshots.get(key)) is None:
+                return None
+
+            return versions.get(version)
+
+
+def get_version(stops: Stops) -> str:
+    """Returns a version token for the given departures."""
+
+    return blake2b(
+        repr(
+            (
+                stops.source,
+                [
+                    (stop.id, stop.name, tuple(stop.geo), tuple(stop.departures))
+                    for stop in stops.stops
+                ],
+            )
+        ).encode(),
+        digest_size=8,
+    ).hexdigest()
+
+
+def _event_key(stop_event: StopEvent) -> tuple:
+    """Returns the identity of a stop event."""
+
+    return (
+        stop_event.type,
+        stop_event.line,
+        stop_event.destination,
+        stop_event.scheduled,
+    )
+
+
+def _event_key_json(stop_event: StopEvent) -> dict:
+    """Returns the JSON-ish identity of a stop event."""
+
+    json = stop_event.to_json()
+    del json["estimated"]
+    return json
+
+
+def _has_unique_events(stop: Stop) -> bool:
+    """Checks whether the stop events of a stop can be told apart."""
+
+    keys = [_event_key(event) for event in stop.departures]
+    return len(keys) == len(set(keys))
+
+
+def _has_unique_stops(stops: Stops) -> bool:
+    """Checks whether the stops can be told apart by their IDs."""
+
+    ids = [stop.id for stop in stops.stops]
+    return len(ids) == len(set(ids))
+
+
+def _is_replaced(old: Stop, new: Stop) -> bool:
+    """Checks whether a stop must be replaced entirely."""
+
+    if old == new:
+        return False
+
+    if (old.name, old.geo) != (new.name, new.geo):
+        return True
+
+    return not _has_unique_events(old) or not _has_unique_events(new)
+
+
+def _diff_stop(old: Stop, new: Stop) -> Optional[dict]:
+    """Returns the changes of the departures of a stop or None if unchanged."""
+
+    old_events = {_event_key(event): event for event in old.departures}
+    new_events = {_event_key(event): event for event in new.departures}
+    added, changed = [], []
+
+    for key, event in new_events.items():
+        if (old_event := old_events.get(key)) is None:
+            added.append(event.to_json())
+        elif old_event.estimated != event.estimated:
+            changed.append(event.to_json())
+
+    removed = [
+        _event_key_json(event)
+        for key, event in old_events.items()
+        if key not in new_events
+    ]
+
+    if not added and not changed and not removed:
+        return None
+
+    return {"id": new.id, "added": added, "changed": changed, "removed": removed}
+
+
+def diff(old: Stops, new: Stops) -> Optional[dict]:
+    """Returns a JSON-ish dict of the changes between two departure versions.
+
+    Stop events are identified by type, line, destination and scheduled
+    time. Stops whose name or location changed or whose stop events
+    cannot be told apart by these are replaced entirely.
+    Returns None if either version contains several stops with the same ID.
+    """
+
+    if not _has_unique_stops(old) or not _has_unique_stops(new):
+        return None
+
+    old_stops = {stop.id: stop for stop in old.stops}
+    new_stops = {stop.id: stop for stop in new.stops}
+    added, changed = [], []
+
+    for id_, stop in new_stops.items():
+        old_stop = old_stops.get(id_)
+
+        if old_stop is None or _is_replaced(old_stop, stop):
+            added.append(stop.to_json())
+        elif (stop_diff := _diff_stop(old_stop, stop)) is not None:
+            changed.append(stop_diff)
+
+    return {
+        "added": added,
+        "changed": changed,
+        "removed": [
+            id_
+            for id_, stop in old_stops.items()
+            if id_ not in new_stops or _is_replaced(stop, new_stops[id_])
+        ],
+        "order": list(new_stops),
+        "source": new.source,
+    }
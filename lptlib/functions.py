@@ -1,9 +1,13 @@
 """Miscellaneous functions."""
 
+from math import asin, cos, radians, sin, sqrt
 from typing import Any, Iterable
 
 
-__all__ = ["is_2_tuple", "contains_only_floats", "is_geo_coordinates"]
+__all__ = ["is_2_tuple", "contains_only_floats", "is_geo_coordinates", "distance"]
+
+
+EARTH_RADIUS = 6_371_000  # meters
 
 
 def is_2_tuple(obj: Any) -> bool:
@@ -22,3 +26,19 @@ def is_geo_coordinates(obj: Any) -> bool:
     """Checks if an object contains geo coordinates."""
 
     return is_2_tuple(obj) and contains_only_floats(obj)
+
+
+def distance(first: tuple[float, float], second: tuple[float, float]) -> float:
+    """Returns the distance between two geo coordinates in meters."""
+
+    lat1, lon1, lat2, lon2 = map(radians, (*first, *second))
+    return (
+        2
+        * EARTH_RADIUS
+        * asin(
+            sqrt(
+                sin((lat2 - lat1) / 2) ** 2
+                + cos(lat1) * cos(lat2) * sin((lon2 - lon1) / 2) ** 2
+            )
+        )
+    )
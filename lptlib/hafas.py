@@ -72,12 +72,15 @@ class ClientWrapper(clientwrapper.ClientWrapper):
     ) -> Iterator[Stop]:
         """Yields stops for the given geo coordinates."""
         for stop, stop_location in enumerate(
-            self.client.nearbystops(geo.latitude, geo.longitude).StopLocation, start=1
+            self.call(
+                self.client.nearbystops, geo.latitude, geo.longitude
+            ).StopLocation,
+            start=1,
         ):
             if stops is not None and stop >= stops:
                 break
 
-            departure_board = self.client.departure_board(stop_location.id)
+            departure_board = self.call(self.client.departure_board, stop_location.id)
 
             # Skip stations without stop events.
             if not departure_board.Departure:
@@ -90,7 +93,9 @@ class ClientWrapper(clientwrapper.ClientWrapper):
 
     def address_to_geo(self, address: Union[Address, str]) -> GeoCoordinates:
         """Converts an address into geo coordinates."""
-        addresses = self.client.locations((address := str(address)), type="A")
+        addresses = self.call(
+            self.client.locations, (address := str(address)), type="A"
+        )
 
         try:
             coord_location = addresses.CoordLocation[0]
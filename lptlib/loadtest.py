@@ -0,0 +1,264 @@
+"""Load testing of the WSGI interface.
+
+Replays requests from a JSONL file, in which each line is a request body of
+the WSGI interface with an optional "weight" to control the target mix.
+Requests are sent in-process to lptlib.wsgi.APPLICATION, which also
+yields a breakdown of the time spent per stage, or to a running server.
+"""
+
+from __future__ import annotations
+from argparse import ArgumentParser, Namespace
+from concurrent.futures import ThreadPoolExecutor
+from json import dumps, loads
+from math import ceil
+from pathlib import Path
+from random import Random
+from threading import local
+from time import perf_counter
+from typing import Callable, Iterable, NamedTuple, Optional
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+from lptlib.timing import collect
+
+
+__all__ = ["Report", "Sample", "load_targets", "main", "run"]
+
+
+PERCENTILES = (50, 95, 99)
+TIMEOUT = 30
+
+
+class Sample(NamedTuple):
+    """Result of a single request.
+
+    A status of 0 indicates that no response was received.
+    """
+
+    status: int
+    duration: float
+    stages: dict[str, float]
+
+
+class Report(NamedTuple):
+    """Aggregated results of a load test."""
+
+    samples: list[Sample]
+    duration: float
+
+    @property
+    def throughput(self) -> float:
+        """Returns the requests per second."""
+        return len(self.samples) / self.duration
+
+    @property
+    def errors(self) -> int:
+        """Returns the amount of failed requests."""
+        return sum(not 0 < sample.status < 400 for sample in self.samples)
+
+    def get_stages(self) -> dict[str, list[float]]:
+        """Returns the durations per stage."""
+        stages = {}
+
+        for sample in self.samples:
+            for name, duration in sample.stages.items():
+                stages.setdefault(name, []).append(duration)
+
+        return stages
+
+    def to_json(self) -> dict:
+        """Returns a JSON-ish dict."""
+        return {
+            "requests": len(self.samples),
+            "errors": self.errors,
+            "duration": self.duration,
+            "throughput": self.throughput,
+            "latency": get_percentiles([sample.duration for sample in self.samples]),
+            "stages": {
+                name: {"count": len(durations), **get_percentiles(durations)}
+                for name, durations in sorted(self.get_stages().items())
+            },
+        }
+
+    def to_text(self) -> str:
+        """Returns a human-readable summary."""
+        json = self.to_json()
+        lines = [
+            f"Requests:   {json['requests']} ({json['errors']} errors)",
+            f"Duration:   {json['duration']:.2f} s",
+            f"Throughput: {json['throughput']:.2f} req/s",
+            "Latency:    "
+            + ", ".join(
+                f"{key} {value * 1000:.1f} ms" for key, value in json["latency"].items()
+            ),
+        ]
+
+        if json["stages"]:
+            lines.append("Stages (upstream.* include ratelimit):")
+
+        for name, stats in json["stages"].items():
+            lines.append(
+                f"  {name:<32} {stats['count']:>6}x "
+                + ", ".join(
+                    f"{key} {value * 1000:.1f} ms"
+                    for key, value in stats.items()
+                    if key != "count"
+                )
+            )
+
+        return "\n".join(lines)
+
+
+def get_percentiles(values: Iterable[float]) -> dict[str, float]:
+    """Returns the nearest-rank percentiles of the values."""
+
+    if not (values := sorted(values)):
+        return {}
+
+    return {
+        f"p{percentile}": values[max(ceil(percentile / 100 * len(values)) - 1, 0)]
+        for percentile in PERCENTILES
+    }
+
+
+def load_targets(path: Path) -> list[tuple[float, dict]]:
+    """Loads weighted request bodies from a JSONL file."""
+
+    targets = []
+
+    with path.open("r", encoding="utf-8") as file:
+        for line in file:
+            if not (line := line.strip()):
+                continue
+
+            body = loads(line)
+            targets.append((float(body.pop("weight", 1)), body))
+
+    return targets
+
+
+def _in_process(config: Optional[Path] = None) -> Callable[[dict], Sample]:
+    """Returns a function to send requests to the WSGI app in-process."""
+
+    # pylint: disable=C0415
+    from lptlib.client import get_registry, use_config
+    from lptlib.wsgi import APPLICATION
+
+    if config is not None:
+        use_config(config)
+
+    get_registry()  # Load clients before measuring.
+
+    clients = local()
+
+    def send(body: dict) -> Sample:
+        if (client := getattr(clients, "client", None)) is None:
+            client = clients.client = APPLICATION.test_client()
+
+        with collect() as stages:
+            start = perf_counter()
+            response = client.post("/", json=body)
+            duration = perf_counter() - start
+
+        return Sample(response.status_code, duration, stages)
+
+    return send
+
+
+def _http(url: str, timeout: float = TIMEOUT) -> Callable[[dict], Sample]:
+    """Returns a function to send requests to a running server."""
+
+    def send(body: dict) -> Sample:
+        request = Request(
+            url,
+            data=dumps(body).encode(),
+            headers={"Content-Type": "application/json"},
+            method="POST",
+        )
+        start = perf_counter()
+
+        try:
+            with urlopen(request, timeout=timeout) as response:
+                response.read()
+                status = response.status
+        except HTTPError as error:
+            status = error.code
+        except OSError:  # URLError, ConnectionError, TimeoutError
+            status = 0
+
+        return Sample(status, perf_counter() - start, {})
+
+    return send
+
+
+def run(
+    targets: list[tuple[float, dict]],
+    requests: int,
+    *,
+    concurrency: int = 1,
+    url: Optional[str] = None,
+    timeout: float = TIMEOUT,
+    config: Optional[Path] = None,
+    seed: Optional[int] = None,
+) -> Report:
+    """Runs the load test.
+
+    In-process tests use the given lpt.json config file, if any.
+    Requests to a running server time out after the given seconds.
+    """
+
+    if not targets:
+        raise ValueError("No targets given.")
+
+    weights, bodies = zip(*targets)
+    bodies = Random(seed).choices(bodies, weights=weights, k=requests)
+    send = _in_process(config) if url is None else _http(url, timeout)
+    start = perf_counter()
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        samples = list(executor.map(send, bodies))
+
+    return Report(samples, perf_counter() - start)
+
+
+def get_args(args: Optional[list[str]] = None) -> Namespace:
+    """Parses the command line arguments."""
+
+    parser = ArgumentParser(description="Load test the LPT WSGI interface.")
+    parser.add_argument("targets", type=Path, help="JSONL file of request bodies")
+    parser.add_argument("-n", "--requests", type=int, default=100)
+    parser.add_argument("-c", "--concurrency", type=int, default=1)
+    parser.add_argument("-u", "--url", help="URL of a running server")
+    parser.add_argument(
+        "-t", "--timeout", type=float, default=TIMEOUT, help="HTTP request timeout"
+    )
+    parser.add_argument(
+        "-C", "--config", type=Path, help="lpt.json to use for in-process tests"
+    )
+    parser.add_argument("-s", "--seed", type=int, help="seed for the target mix")
+    parser.add_argument("-j", "--json", action="store_true", help="output JSON")
+    return parser.parse_args(args)
+
+
+def main(args: Optional[list[str]] = None) -> None:
+    """Runs the load test from the command line."""
+
+    args = get_args(args)
+    report = run(
+        load_targets(args.targets),
+        args.requests,
+        concurrency=args.concurrency,
+        url=args.url,
+        timeout=args.timeout,
+        config=args.config,
+        seed=args.seed,
+    )
+
+    if args.json:
+        print(dumps(report.to_json(), indent=2))
+    else:
+        print(report.to_text())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+"""Merging of departures from multiple clients."""
+
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextvars import copy_context
+from logging import getLogger
+from re import sub
+from time import monotonic
+from typing import Iterable, Optional, Union
+
+from mdb import Address
+from wsgilib import Error
+
+from lptlib.clientwrapper import ClientWrapper
+from lptlib.config import get_merge_timeout
+from lptlib.datastructures import GeoCoordinates, Stop, StopEvent, Stops
+from lptlib.exceptions import NoGeoCoordinatesForAddress
+from lptlib.functions import distance
+
+
+__all__ = ["get_departures"]
+
+
+LOGGER = getLogger("lptlib")
+MAX_DISTANCE = 200  # meters
+
+
+def _normalize(name: str) -> str:
+    """Returns the normalized name of a stop or destination."""
+
+    return " ".join(sub(r"[^\w]+", " ", name.casefold().replace("ß", "ss")).split())
+
+
+def _is_same_stop(stop: Stop, other: Stop) -> bool:
+    """Checks whether two stops from different sources are the same."""
+
+    if not (name := _normalize(stop.name)) or name != _normalize(other.name):
+        return False
+
+    return distance(stop.geo, other.geo) <= MAX_DISTANCE
+
+
+def _event_key(stop_event: StopEvent) -> tuple:
+    """Returns the key to identify a stop event across sources."""
+
+    return (
+        stop_event.type,
+        stop_event.line,
+        _normalize(stop_event.destination),
+        stop_event.scheduled,
+    )
+
+
+def _merge_departures(
+    stop_events: Iterable[Iterable[StopEvent]], departures: Optional[int] = None
+) -> list[StopEvent]:
+    """Merges departures of the same stop from different sources
+    sorted by scheduled time, omitting duplicates across sources.
+    """
+
+    merged: list[StopEvent] = []
+    previous: dict[tuple, list[int]] = {}
+
+    for events in stop_events:
+        matched: dict[tuple, list[int]] = {}
+
+        for stop_event in events:
+            key = _event_key(stop_event)
+
+            if indices := previous.get(key):
+                index = indices.pop(0)
+
+                if merged[index].estimated is None:
+                    merged[index] = stop_event
+            else:
+                index = len(merged)
+                merged.append(stop_event)
+
+            matched.setdefault(key, []).append(index)
+
+        for key, indices in matched.items():
+            previous.setdefault(key, []).extend(indices)
+
+    return sorted(merged, key=lambda event: event.scheduled)[:departures]
+
+
+def _merge_stops(
+    results: Iterable[tuple[str, list[Stop]]],
+    geo: GeoCoordinates,
+    *,
+    stops: Optional[int] = None,
+    departures: Optional[int] = None,
+) -> list[Stop]:
+    """Merges stops of different sources by distance and name, nearest first."""
+
+    groups: list[tuple[set[str], list[Stop]]] = []
+
+    for source, result in results:
+        for stop in result:
+            for sources, group in groups:
+                if source not in sources and _is_same_stop(group[0], stop):
+                    sources.add(source)
+                    group.append(stop)
+                    break
+            else:
+                groups.append(({source}, [stop]))
+
+    return sorted(
+        (
+            group[0]._replace(
+                departures=_merge_departures(
+                    (stop.departures for stop in group), departures
+                )
+            )
+            for _, group in groups
+        ),
+        key=lambda stop: distance(geo, stop.geo),
+    )[:stops]
+
+
+def _get_geo(
+    clients: list[ClientWrapper], address: Union[Address, str], deadline: float
+) -> GeoCoordinates:
+    """Returns the geo coordinates of the address from the first client able to."""
+
+    failed = False
+
+    for client in clients:
+        if monotonic() >= deadline:
+            break
+
+        try:
+            return client.address_to_geo(address)
+        except NoGeoCoordinatesForAddress:
+            LOGGER.warning("Client %s could not locate address.", client.source)
+        except Exception:  # pylint: disable=W0703
+            LOGGER.exception("Client %s failed to locate address.", client.source)
+            failed = True
+
+    if not failed:
+        raise NoGeoCoordinatesForAddress(str(address))
+
+    raise Error("No source could locate the address.", status=502)
+
+
+def _get_stops(
+    client: ClientWrapper,
+    geo: GeoCoordinates,
+    stops: Optional[int],
+    departures: Optional[int],
+) -> list[Stop]:
+    """Returns a list of stops from the client."""
+
+    return list(client.get_departures_geo(geo, stops=stops, departures=departures))
+
+
+def get_departures(
+    clients: list[ClientWrapper],
+    address: Union[Address, str],
+    *,
+    stops: Optional[int] = None,
+    departures: Optional[int] = None,
+) -> Stops:
+    """Queries the clients in parallel and merges their departures.
+
+    Waits at most for the largest timeout of the clients, including the
+    time to locate the address. Sources that fail or did not respond by
+    then are omitted.
+    """
+
+    timeouts = [client.timeout for client in clients if client.timeout is not None]
+    deadline = monotonic() + max(timeouts, default=get_merge_timeout())
+    executor = ThreadPoolExecutor(max_workers=len(clients))
+    geo_future = executor.submit(
+        copy_context().run, _get_geo, clients, address, deadline
+    )
+
+    if not wait([geo_future], timeout=max(deadline - monotonic(), 0)).done:
+        executor.shutdown(wait=False, cancel_futures=True)
+        raise Error("Locating the address timed out.", status=504)
+
+    try:
+        geo = geo_future.result()
+    except Exception:
+        executor.shutdown(wait=False)
+        raise
+
+    futures = {
+        executor.submit(
+            copy_context().run, _get_stops, client, geo, stops, departures
+        ): client
+        for client in clients
+    }
+    done, pending = wait(futures, timeout=max(deadline - monotonic(), 0))
+    executor.shutdown(wait=False, cancel_futures=True)
+    results, sources = [], []
+
+    for future in pending:
+        LOGGER.warning("Client %s timed out.", futures[future].source)
+
+    for future, client in futures.items():
+        if future not in done:
+            continue
+
+        try:
+            results.append((client.source, future.result()))
+        except Exception:  # pylint: disable=W0703
+            LOGGER.exception("Client %s failed.", client.source)
+            continue
+
+        sources.append(client.source)
+
+    if not sources:
+        raise Error("No source delivered departures.", status=502)
+
+    return Stops(
+        _merge_stops(results, geo, stops=stops, departures=departures),
+        ", ".join(sources),
+    )
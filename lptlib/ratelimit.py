@@ -0,0 +1,220 @@
+"""Adaptive per-source rate limiting of upstream requests."""
+
+from __future__ import annotations
+from contextlib import contextmanager
+from contextvars import ContextVar
+from enum import IntEnum
+from logging import getLogger
+from threading import Condition
+from time import monotonic
+from typing import Any, Callable, Iterator, Optional
+
+from lptlib.timing import stage
+
+
+__all__ = ["Priority", "Scheduler", "get_priority", "is_throttled", "priority"]
+
+
+LOGGER = getLogger("lptlib")
+
+
+class Priority(IntEnum):
+    """Request priorities."""
+
+    INTERACTIVE = 0
+    BACKGROUND = 1
+
+
+PRIORITY = ContextVar("priority", default=Priority.INTERACTIVE)
+
+
+class Scheduler:
+    """Token bucket scheduler for requests to one upstream source.
+
+    Interactive requests are always served before waiting background
+    requests. The rate is halved whenever the upstream source throttles
+    us and slowly recovers towards the configured rate afterwards.
+    The limit applies to the current process only.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: Optional[float] = None,
+        *,
+        min_rate: Optional[float] = None,
+        recovery: Optional[float] = None,
+        timeout: Optional[float] = None,
+    ):
+        self.max_rate = self.rate = rate
+        self.burst = self.tokens = max(rate, 1) if burst is None else burst
+        self.min_rate = rate / 10 if min_rate is None else min_rate
+        self.recovery = rate / 20 if recovery is None else recovery
+        self.timeout = timeout
+        self.updated = monotonic()
+        self.decreased = float("-inf")
+        self.waiting = {priority: 0 for priority in Priority}
+        self.condition = Condition()
+
+    def __repr__(self):
+        return (
+            f"{type(self).__name__}(rate={self.rate:.2f}/{self.max_rate:.2f}, "
+            f"burst={self.burst})"
+        )
+
+    @classmethod
+    def from_json(cls, json: dict) -> Scheduler:
+        """Creates a scheduler from a JSON config entry.
+
+        Raises ValueError on invalid settings.
+        """
+        if not isinstance(json, dict):
+            raise ValueError(f"Rate limit must be an object: {json!r}")
+
+        if (rate := _get_float(json, "rate")) is None:
+            raise ValueError("Rate limit has no rate.")
+
+        if rate <= 0:
+            raise ValueError(f"Rate limit must be positive: {rate}")
+
+        scheduler = cls(
+            rate,
+            _get_float(json, "burst"),
+            min_rate=_get_float(json, "min_rate"),
+            recovery=_get_float(json, "recovery"),
+            timeout=_get_float(json, "timeout"),
+        )
+
+        if scheduler.burst < 1:
+            raise ValueError(f"Rate limit burst must be at least 1: {scheduler.burst}")
+
+        if scheduler.min_rate <= 0:
+            raise ValueError(f"Minimum rate must be positive: {scheduler.min_rate}")
+
+        if scheduler.recovery < 0:
+            raise ValueError(f"Recovery must not be negative: {scheduler.recovery}")
+
+        return scheduler
+
+    def _refill(self) -> None:
+        """Adds tokens for the time elapsed since the last refill."""
+        now = monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def _may_proceed(self, priority_: Priority) -> bool:
+        """Checks whether a request of the given priority may be sent now."""
+        if self.tokens < 1:
+            return False
+
+        return not any(self.waiting[prio] for prio in Priority if prio < priority_)
+
+    def acquire(self, priority_: Optional[Priority] = None) -> None:
+        """Blocks until a request may be sent."""
+        priority_ = get_priority() if priority_ is None else priority_
+        deadline = None if self.timeout is None else monotonic() + self.timeout
+
+        with self.condition:
+            self.waiting[priority_] += 1
+
+            try:
+                while True:
+                    self._refill()
+
+                    if self._may_proceed(priority_):
+                        break
+
+                    wait = max((1 - self.tokens) / self.rate, 0.001)
+
+                    if deadline is not None:
+                        if (remaining := deadline - monotonic()) <= 0:
+                            raise TimeoutError(f"Rate limit exceeded: {self}")
+
+                        wait = min(wait, remaining)
+
+                    self.condition.wait(wait)
+
+                self.tokens -= 1
+            finally:
+                self.waiting[priority_] -= 1
+                self.condition.notify_all()
+
+    def throttled(self) -> None:
+        """Decreases the rate after the source throttled us.
+
+        Throttled responses within 1 / rate seconds after the last decrease
+        stem from requests already in flight and do not decrease it further.
+        """
+        with self.condition:
+            self._refill()
+            self.tokens = min(self.tokens, 0)
+
+            if self.updated - self.decreased < 1 / self.rate:
+                return
+
+            self.rate = max(self.min_rate, self.rate / 2)
+            self.decreased = self.updated
+            LOGGER.warning("Upstream throttled. Reducing rate: %s", self)
+
+    def succeeded(self) -> None:
+        """Increases the rate after a successful request."""
+        if self.rate >= self.max_rate:
+            return
+
+        with self.condition:
+            self._refill()
+            self.rate = min(self.max_rate, self.rate + self.recovery)
+
+    def call(self, function: Callable[..., Any], *args, **kwargs) -> Any:
+        """Calls the given function within the rate limit."""
+        with stage("ratelimit"):
+            self.acquire()
+
+        try:
+            result = function(*args, **kwargs)
+        except Exception as error:
+            if is_throttled(error):
+                self.throttled()
+
+            raise
+
+        self.succeeded()
+        return result
+
+
+def _get_float(json: dict, key: str) -> Optional[float]:
+    """Returns the respective value as float, if set."""
+
+    if (value := json.get(key)) is None:
+        return None
+
+    try:
+        return float(value)
+    except TypeError:
+        raise ValueError(f"Rate limit {key} must be a number: {value!r}") from None
+
+
+def get_priority() -> Priority:
+    """Returns the priority of the current context."""
+
+    return PRIORITY.get()
+
+
+@contextmanager
+def priority(priority_: Priority) -> Iterator[Priority]:
+    """Sets the request priority within the context."""
+
+    token = PRIORITY.set(priority_)
+
+    try:
+        yield priority_
+    finally:
+        PRIORITY.reset(token)
+
+
+def is_throttled(error: Exception) -> bool:
+    """Checks whether the exception indicates an upstream throttling response."""
+
+    response = getattr(error, "response", None)
+    status = getattr(response, "status_code", getattr(response, "status", None))
+    return status in {429, 503}
@@ -0,0 +1,146 @@
+"""Snapshots of departures for offline use.
+
+Snapshots are gzipped JSONL files with one {"key": ..., "departures": ...}
+record per line, where "departures" is the JSON representation of Stops.
+"""
+
+from __future__ import annotations
+from datetime import datetime
+from gzip import GzipFile
+from json import dumps, loads
+from logging import getLogger
+from pathlib import Path
+from threading import Lock
+from typing import BinaryIO, Iterator, Optional
+
+from lptlib.config import get_reload_interval, get_snapshot_file
+from lptlib.datastructures import Stops
+from lptlib.watcher import FileWatcher, get_mtime
+
+
+__all__ = [
+    "SnapshotWriter",
+    "get_snapshot",
+    "iter_snapshots",
+    "load",
+    "load_snapshots",
+    "trim",
+    "watch",
+]
+
+
+LOGGER = getLogger("lptlib")
+LOCK = Lock()
+SNAPSHOTS: dict[str, Stops] = {}
+WATCHERS: dict[Path, Optional[FileWatcher]] = {}
+
+
+class SnapshotWriter:
+    """Writes a gzipped stream of JSON (key, stops) records."""
+
+    def __init__(self, file: BinaryIO):
+        self.file = GzipFile(fileobj=file, mode="wb")
+
+    def __enter__(self) -> SnapshotWriter:
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+    def write(self, key: str, stops: Stops) -> None:
+        """Writes a record."""
+        record = {"key": key, "departures": stops.to_json()}
+        self.file.write(dumps(record).encode() + b"\n")
+
+    def close(self) -> None:
+        """Closes the underlying gzip stream."""
+        self.file.close()
+
+
+def iter_snapshots(path: Path) -> Iterator[tuple[str, Stops]]:
+    """Yields (key, stops) records from a snapshot file."""
+
+    with GzipFile(path, mode="rb") as file:
+        for line in file:
+            if line := line.strip():
+                record = loads(line)
+                yield record["key"], Stops.from_json(record["departures"])
+
+
+def load_snapshots(path: Path) -> dict[str, Stops]:
+    """Loads a key / stops map from a snapshot file."""
+
+    return dict(iter_snapshots(path))
+
+
+def load(path: Path) -> None:
+    """Loads the snapshot file and replaces the current snapshots."""
+
+    global SNAPSHOTS  # pylint: disable=W0603
+    SNAPSHOTS = load_snapshots(path)
+    LOGGER.info('Loaded %i snapshots from "%s".', len(SNAPSHOTS), path)
+
+
+def watch() -> None:
+    """Loads the snapshot file configured in lptlib.conf, if any, on the
+    first call and reloads it in the background whenever it changes.
+    """
+
+    if (path := get_snapshot_file()) is None or path in WATCHERS:
+        return
+
+    with LOCK:
+        if path in WATCHERS:
+            return
+
+        mtime = get_mtime(path)
+
+        try:
+            load(path)
+        except FileNotFoundError:
+            LOGGER.warning('Snapshot file "%s" not found.', path)
+        except Exception:  # pylint: disable=W0703
+            LOGGER.exception('Could not load snapshot file "%s".', path)
+            mtime = None
+
+        if (interval := get_reload_interval()) <= 0:
+            WATCHERS[path] = None
+            return
+
+        WATCHERS[path] = FileWatcher(path, interval, load, mtime)
+        WATCHERS[path].start()
+
+
+def trim(
+    stops: Stops,
+    *,
+    max_stops: Optional[int] = None,
+    max_departures: Optional[int] = None,
+    now: Optional[datetime] = None,
+) -> Stops:
+    """Removes past departures and limits the amount of stops and departures."""
+
+    now = datetime.now() if now is None else now
+    return stops._replace(
+        stops=[
+            stop._replace(
+                departures=[
+                    departure
+                    for departure in stop.departures
+                    if (departure.estimated or departure.scheduled) >= now
+                ][:max_departures]
+            )
+            for stop in stops.stops[:max_stops]
+        ]
+    )
+
+
+def get_snapshot(
+    key: str, *, stops: Optional[int] = None, departures: Optional[int] = None
+) -> Optional[Stops]:
+    """Returns the current departures of the snapshot for the given key."""
+
+    if (snapshot := SNAPSHOTS.get(key)) is None:
+        return None
+
+    return trim(snapshot, max_stops=stops, max_departures=departures)
@@ -0,0 +1,397 @@
+"""Local stub of TRIAS and HAFAS upstream APIs for load testing.
+
+TRIAS requests are accepted as POST requests on any path,
+HAFAS REST requests as GET requests on the paths
+".../location.name", ".../location.nearbystops" and ".../departureBoard".
+"""
+
+from __future__ import annotations
+from argparse import ArgumentParser, Namespace
+from datetime import datetime, timedelta, timezone
+from hashlib import blake2b
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from json import dumps
+from logging import INFO, basicConfig, getLogger
+from random import Random
+from re import compile as compile_
+from threading import Lock
+from time import sleep
+from typing import NamedTuple, Optional
+from urllib.parse import parse_qs, urlparse
+from xml.sax.saxutils import escape, quoteattr
+
+from lptlib.config import FALLBACK_CLIENT
+
+
+__all__ = ["Behaviour", "StubServer", "get_lpt_config", "main"]
+
+
+LOGGER = getLogger("lptlib.stub")
+TRIAS_NAMESPACES = (
+    'xmlns="http://www.vdv.de/trias" xmlns:siri="http://www.siri.org.uk/siri"'
+)
+HAFAS_NAMESPACE = "hafas_rest_v1"
+TIMESTAMP = compile_(rb"<([\w:]*)RequestTimestamp>.*?</\1RequestTimestamp>")
+LINES = [
+    ("Bus", "bus", "localBus", "1", "Hauptbahnhof"),
+    ("Bus", "bus", "localBus", "12", "Klinikum"),
+    ("Straßenbahn", "tram", "cityTram", "4", "Messe"),
+    ("S-Bahn", "rail", "suburbanRailway", "S5", "Flughafen"),
+]
+
+
+class Behaviour(NamedTuple):
+    """Latency and error distribution of the stub server."""
+
+    latency: float = 0.05
+    jitter: float = 0.02
+    error_rate: float = 0.0
+    throttle_rate: float = 0.0
+    stops: int = 5
+    departures: int = 10
+
+    def get_latency(self, random: Random) -> float:
+        """Returns a random latency in seconds."""
+        return max(random.gauss(self.latency, self.jitter), 0)
+
+    def get_status(self, random: Random) -> int:
+        """Returns a random HTTP status code."""
+        if (value := random.random()) < self.throttle_rate:
+            return 429
+
+        if value < self.throttle_rate + self.error_rate:
+            return 500
+
+        return 200
+
+
+class StubServer(ThreadingHTTPServer):
+    """Threaded HTTP server with the stub's behaviour."""
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address: tuple[str, int],
+        behaviour: Behaviour = Behaviour(),
+        seed: Optional[int] = None,
+    ):
+        super().__init__(address, RequestHandler)
+        self.behaviour = behaviour
+        self.random = Random(seed)
+        self.lock = Lock()
+
+    def get_response_params(self) -> tuple[float, int]:
+        """Returns latency and status for the next response."""
+        with self.lock:
+            return (
+                self.behaviour.get_latency(self.random),
+                self.behaviour.get_status(self.random),
+            )
+
+
+class RequestHandler(BaseHTTPRequestHandler):
+    """Handles TRIAS and HAFAS requests."""
+
+    server: StubServer
+
+    def log_message(self, format: str, *args) -> None:  # pylint: disable=W0622
+        LOGGER.debug(format, *args)
+
+    def respond(self, body: bytes, content_type: str = "application/xml") -> None:
+        """Sends the response after simulating latency and errors."""
+        latency, status = self.server.get_response_params()
+        sleep(latency)
+
+        if status != 200:
+            body, content_type = f"Error {status}".encode(), "text/plain"
+
+        self.send_response(status)
+        self.send_header("Content-Type", f"{content_type}; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self) -> None:  # pylint: disable=C0103
+        """Handles TRIAS requests."""
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+        if b"StopEventRequest" in body:
+            return self.respond(trias_stop_events(body, self.server.behaviour))
+
+        if b"LocationInformationRequest" in body:
+            return self.respond(trias_locations(body, self.server.behaviour))
+
+        return self.send_error(400, "Unsupported TRIAS request")
+
+    def do_GET(self) -> None:  # pylint: disable=C0103
+        """Handles HAFAS requests."""
+        url = urlparse(self.path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+
+        if url.path.endswith("/location.name"):
+            return self.respond(hafas_coord_locations(query))
+
+        if url.path.endswith("/location.nearbystops"):
+            return self.respond(hafas_stop_locations(query, self.server.behaviour))
+
+        if url.path.endswith("/departureBoard"):
+            return self.respond(hafas_departure_board(query, self.server.behaviour))
+
+        return self.send_error(404, "Unsupported HAFAS service")
+
+
+def _seed(data: bytes) -> int:
+    """Returns a stable seed for the given request data."""
+
+    data = TIMESTAMP.sub(b"", data)
+    return int.from_bytes(blake2b(data, digest_size=8).digest(), "big")
+
+
+def _now() -> datetime:
+    """Returns the current time rounded to minutes."""
+
+    return datetime.now(timezone.utc).replace(second=0, microsecond=0)
+
+
+def _departures(seed: int, count: int) -> list[tuple[tuple, datetime, datetime]]:
+    """Returns line, scheduled and estimated times of pseudo-random departures."""
+
+    random, scheduled = Random(seed), _now()
+    departures = []
+
+    for _ in range(count):
+        scheduled += timedelta(minutes=random.randint(1, 10))
+        estimated = scheduled + timedelta(minutes=random.choice([0, 0, 0, 1, 2, 5]))
+        departures.append((random.choice(LINES), scheduled, estimated))
+
+    return departures
+
+
+def _text(text: str) -> str:
+    """Returns a TRIAS internationalized text."""
+
+    return f"<Text>{escape(text)}</Text><Language>de</Language>"
+
+
+def _trias(payload: str) -> bytes:
+    """Wraps the delivery payload into a TRIAS service delivery."""
+
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        f'<Trias {TRIAS_NAMESPACES} version="1.1"><ServiceDelivery>'
+        f"<siri:ResponseTimestamp>{_now().isoformat()}</siri:ResponseTimestamp>"
+        "<siri:ProducerRef>lptlib-stub</siri:ProducerRef>"
+        "<siri:Status>true</siri:Status><MoreData>false</MoreData>"
+        f"<Language>de</Language><DeliveryPayload>{payload}</DeliveryPayload>"
+        "</ServiceDelivery></Trias>"
+    ).encode()
+
+
+def trias_locations(request: bytes, behaviour: Behaviour) -> bytes:
+    """Returns a TRIAS location information response."""
+
+    random, locations = Random(seed := _seed(request)), []
+
+    for index in range(behaviour.stops):
+        ref, name = f"de:stub:{seed % 100000}:{index}", f"Stub Stop {index}"
+        locations.append(
+            "<Location><Location><StopPoint>"
+            f"<StopPointRef>{ref}</StopPointRef>"
+            f"<StopPointName>{_text(name)}</StopPointName>"
+            f"</StopPoint><LocationName>{_text(name)}</LocationName>"
+            f"<GeoPosition><Longitude>{random.uniform(6, 15):.6f}</Longitude>"
+            f"<Latitude>{random.uniform(47, 55):.6f}</Latitude></GeoPosition>"
+            "</Location><Complete>true</Complete><Probability>1</Probability>"
+            "</Location>"
+        )
+
+    return _trias(
+        "<LocationInformationResponse>"
+        + "".join(locations)
+        + "</LocationInformationResponse>"
+    )
+
+
+def trias_stop_events(request: bytes, behaviour: Behaviour) -> bytes:
+    """Returns a TRIAS stop event response."""
+
+    results = []
+
+    for index, (line, scheduled, estimated) in enumerate(
+        _departures(_seed(request), behaviour.departures), start=1
+    ):
+        name, mode, submode, number, destination = line
+        results.append(
+            f"<StopEventResult><ResultId>{index}</ResultId><StopEvent>"
+            "<ThisCall><CallAtStop><StopPointRef>de:stub</StopPointRef>"
+            f"<StopPointName>{_text('Stub Stop')}</StopPointName>"
+            "<ServiceDeparture>"
+            f"<TimetabledTime>{scheduled.isoformat()}</TimetabledTime>"
+            f"<EstimatedTime>{estimated.isoformat()}</EstimatedTime>"
+            "</ServiceDeparture><StopSeqNumber>1</StopSeqNumber>"
+            "</CallAtStop></ThisCall><Service>"
+            f"<OperatingDayRef>{scheduled.date().isoformat()}</OperatingDayRef>"
+            f"<JourneyRef>stub:{number}:{index}</JourneyRef>"
+            f"<LineRef>stub:{number}</LineRef><DirectionRef>outward</DirectionRef>"
+            f"<Mode><PtMode>{mode}</PtMode>"
+            f"<{mode.title()}Submode>{submode}</{mode.title()}Submode>"
+            f"<Name>{_text(name)}</Name></Mode>"
+            f"<PublishedLineName>{_text(number)}</PublishedLineName>"
+            "<OriginStopPointRef>de:stub:origin</OriginStopPointRef>"
+            f"<OriginText>{_text('Stub Origin')}</OriginText>"
+            "<DestinationStopPointRef>de:stub:destination</DestinationStopPointRef>"
+            f"<DestinationText>{_text(destination)}</DestinationText>"
+            "</Service></StopEvent></StopEventResult>"
+        )
+
+    return _trias("<StopEventResponse>" + "".join(results) + "</StopEventResponse>")
+
+
+def _hafas(root: str, content: str) -> bytes:
+    """Returns a HAFAS REST XML document."""
+
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        f'<{root} xmlns="{HAFAS_NAMESPACE}">{content}</{root}>'
+    ).encode()
+
+
+def hafas_coord_locations(query: dict[str, str]) -> bytes:
+    """Returns a HAFAS location list with an address."""
+
+    random = Random(_seed((name := query.get("input", "")).encode()))
+    return _hafas(
+        "LocationList",
+        f"<CoordLocation name={quoteattr(name)}"
+        f' type="ADR" lon="{random.uniform(6, 15):.6f}"'
+        f' lat="{random.uniform(47, 55):.6f}"/>',
+    )
+
+
+def hafas_stop_locations(query: dict[str, str], behaviour: Behaviour) -> bytes:
+    """Returns a HAFAS location list with stops."""
+
+    seed = _seed(dumps(query, sort_keys=True).encode())
+    lat = float(query.get("originCoordLat", 0))
+    lon = float(query.get("originCoordLong", 0))
+    return _hafas(
+        "LocationList",
+        "".join(
+            f'<StopLocation id="stub{seed % 100000}{index}"'
+            f' extId="{seed % 100000}{index}" name="Stub Stop {index}"'
+            f' lon="{lon + index / 1000:.6f}" lat="{lat + index / 1000:.6f}"/>'
+            for index in range(behaviour.stops)
+        ),
+    )
+
+
+def hafas_departure_board(query: dict[str, str], behaviour: Behaviour) -> bytes:
+    """Returns a HAFAS departure board."""
+
+    departures = []
+
+    for index, (line, scheduled, estimated) in enumerate(
+        _departures(_seed((id_ := query.get("id", "")).encode()), behaviour.departures)
+    ):
+        name, _, _, number, destination = line
+        scheduled, estimated = scheduled.astimezone(), estimated.astimezone()
+        departures.append(
+            f'<Departure name="{name} {number}" type="ST" stop="Stub Stop"'
+            f" stopid={quoteattr(id_)} stopExtId={quoteattr(id_)}"
+            f' time="{scheduled:%H:%M:%S}" date="{scheduled:%Y-%m-%d}"'
+            f' rtTime="{estimated:%H:%M:%S}" rtDate="{estimated:%Y-%m-%d}"'
+            f' direction="{destination}">'
+            f'<JourneyDetailRef ref="stub|{number}|{index}"/>'
+            f'<Product name="{name} {number}" internalName="{name} {number}"'
+            f' displayNumber="{number}" num="{number}" line="{number}"'
+            f' catOut="{name}" catIn="{name[:3]}" catCode="5" catOutS="{name[:3]}"'
+            f' catOutL="{name}"/>'
+            "</Departure>"
+        )
+
+    return _hafas("DepartureBoard", "".join(departures))
+
+
+def get_lpt_config(host: str, port: int) -> dict:
+    """Returns an lpt.json config directing all requests to the stub server.
+
+    ZIP codes are split between the stub's TRIAS and HAFAS APIs and the
+    fallback client is replaced by the stub's TRIAS API.
+    """
+
+    trias = {
+        "type": "trias",
+        "url": f"http://{host}:{port}/trias",
+        "requestor_ref": "lptlib-stub",
+        "source": "Stub TRIAS",
+        "validate": False,
+    }
+    return {
+        "clients": {
+            "Stub TRIAS": trias,
+            "Stub HAFAS": {
+                "type": "hafas",
+                "url": f"http://{host}:{port}/hafas",
+                "access_id": "lptlib-stub",
+                "source": "Stub HAFAS",
+            },
+            FALLBACK_CLIENT: {**trias, "source": f"{FALLBACK_CLIENT} (Stub)"},
+        },
+        "map": {"Stub TRIAS": [[0, 49999]], "Stub HAFAS": [[50000, 99999]]},
+    }
+
+
+def get_args(args: Optional[list[str]] = None) -> Namespace:
+    """Parses the command line arguments."""
+
+    parser = ArgumentParser(description="Stub TRIAS / HAFAS upstream server.")
+    parser.add_argument("--host", default="127.0.0.1", help="address to bind to")
+    parser.add_argument("--port", type=int, default=8089, help="port to bind to")
+    parser.add_argument("--latency", type=float, default=0.05, help="mean latency")
+    parser.add_argument("--jitter", type=float, default=0.02, help="latency stddev")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="HTTP 500 rate")
+    parser.add_argument(
+        "--throttle-rate", type=float, default=0.0, help="HTTP 429 rate"
+    )
+    parser.add_argument("--stops", type=int, default=5, help="stops per response")
+    parser.add_argument("--departures", type=int, default=10, help="departures/stop")
+    parser.add_argument("--seed", type=int, help="random seed")
+    parser.add_argument(
+        "--print-config",
+        action="store_true",
+        help="print an lpt.json for the stub and exit",
+    )
+    return parser.parse_args(args)
+
+
+def main(args: Optional[list[str]] = None) -> None:
+    """Runs the stub server."""
+
+    args = get_args(args)
+
+    if args.print_config:
+        print(dumps(get_lpt_config(args.host, args.port), indent=4))
+        return
+
+    basicConfig(level=INFO)
+    behaviour = Behaviour(
+        args.latency,
+        args.jitter,
+        args.error_rate,
+        args.throttle_rate,
+        args.stops,
+        args.departures,
+    )
+
+    with StubServer((args.host, args.port), behaviour, args.seed) as server:
+        LOGGER.info("Serving stub upstream on %s:%i.", args.host, args.port)
+
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+"""Per-request stage timing."""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from time import perf_counter
+from typing import Iterator, Optional
+
+
+__all__ = ["collect", "stage"]
+
+
+TIMINGS: ContextVar[Optional[dict[str, float]]] = ContextVar("timings", default=None)
+
+
+@contextmanager
+def collect() -> Iterator[dict[str, float]]:
+    """Collects the durations of the stages run within the context."""
+
+    token = TIMINGS.set(timings := {})
+
+    try:
+        yield timings
+    finally:
+        TIMINGS.reset(token)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Records the duration of a stage if timings are being collected."""
+
+    if (timings := TIMINGS.get()) is None:
+        yield
+        return
+
+    start = perf_counter()
+
+    try:
+        yield
+    finally:
+        timings[name] = timings.get(name, 0) + perf_counter() - start
@@ -48,8 +48,8 @@ def _make_stop(location: LocationResultStructure, departures: list[StopEvent]) -
         str(location.Location.StopPoint.StopPointRef.value()),
         str(location.Location.StopPoint.StopPointName.Text),
         GeoCoordinates(
-            float(location.Location.GeoPosition.Longitude),
             float(location.Location.GeoPosition.Latitude),
+            float(location.Location.GeoPosition.Longitude),
         ),
         departures,
     )
@@ -113,8 +113,8 @@ class ClientWrapper(clientwrapper.ClientWrapper):
         """Yields departures for the given geo coordinates."""
 
         for stop, location in enumerate(
-            self.client.stops(
-                geo
+            self.call(
+                self.client.stops, geo
             ).ServiceDelivery.DeliveryPayload.LocationInformationResponse.Location,
             start=1,
         ):
@@ -125,8 +125,9 @@ class ClientWrapper(clientwrapper.ClientWrapper):
                 location,
                 list(
                     _stop_events(
-                        self.client.stop_event(
-                            location.Location.StopPoint.StopPointRef.value()
+                        self.call(
+                            self.client.stop_event,
+                            location.Location.StopPoint.StopPointRef.value(),
                         ).ServiceDelivery.DeliveryPayload.StopEventResponse.StopEventResult,
                         departures=departures,
                     )
@@ -140,7 +141,7 @@ class ClientWrapper(clientwrapper.ClientWrapper):
         if self.fix_address:
             address = _fix_address(address)
 
-        if (geocoordinates := self.client.geocoordinates(address)) is None:
+        if (geocoordinates := self.call(self.client.geocoordinates, address)) is None:
             raise NoGeoCoordinatesForAddress(address)
 
         return geocoordinates
@@ -0,0 +1,65 @@
+"""Watching of files for changes."""
+
+from logging import getLogger
+from pathlib import Path
+from threading import Event, Thread
+from typing import Any, Callable, Optional
+
+
+__all__ = ["FileWatcher", "get_mtime"]
+
+
+LOGGER = getLogger("lptlib")
+
+
+class FileWatcher(Thread):
+    """Calls a function in the background whenever a file's mtime changes.
+
+    If the file vanishes, the function is not called until it reappears.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        interval: float,
+        callback: Callable[[Path], Any],
+        mtime: Optional[float] = None,
+    ):
+        super().__init__(name=f"lptlib file watcher ({path})", daemon=True)
+        self.path = path
+        self.interval = interval
+        self.callback = callback
+        self.mtime = mtime
+        self.stopped = Event()
+
+    def run(self) -> None:
+        """Polls the file's mtime until stopped."""
+        while not self.stopped.wait(self.interval):
+            if (mtime := get_mtime(self.path)) == self.mtime:
+                continue
+
+            if mtime is None:
+                LOGGER.warning('File "%s" vanished. Keeping current data.', self.path)
+                self.mtime = None
+                continue
+
+            try:
+                self.callback(self.path)
+            except Exception:  # pylint: disable=W0703
+                LOGGER.exception('Could not reload file "%s".', self.path)
+                continue
+
+            self.mtime = mtime
+
+    def stop(self) -> None:
+        """Stops the watcher."""
+        self.stopped.set()
+
+
+def get_mtime(path: Path) -> Optional[float]:
+    """Returns the file's mtime or None if it does not exist."""
+
+    try:
+        return path.stat().st_mtime
+    except FileNotFoundError:
+        return None
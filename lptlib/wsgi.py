@@ -3,50 +3,94 @@
 XXX: For internal use only!
 """
 
+from logging import getLogger
+from typing import Optional
+
 from flask import request
 
-from hwdb import Deployment
 from mdb import Address
-from wsgilib import Application, JSON
+from wsgilib import Application, Error, JSON
 
+from lptlib import api
 from lptlib.api import get_departures
+from lptlib.datastructures import Stops
+from lptlib.delta import SnapshotStore, diff
+from lptlib.snapshot import get_snapshot, watch
+from lptlib.timing import stage
 
 
 __all__ = ["APPLICATION"]
 
 
 APPLICATION = Application("lpt", cors=True)
+LOGGER = getLogger("lptlib")
+SNAPSHOTS = SnapshotStore()
 
 
 @APPLICATION.route("/", methods=["POST"], strict_slashes=False)
 def _get_departures() -> JSON:
-    """Return the respective departures as a JSON object."""
+    """Return the respective departures as a JSON object.
+
+    If the client sends the version of its last response, only the
+    changes since that version are returned, if they can be determined.
+    """
+
+    watch()
+
+    with stage("address"):
+        address = get_address()
+
+    stops = request.json.get("stops")
+    departures = request.json.get("departures")
+    result = get_departures_or_snapshot(address, stops, departures)
+    key = (str(address), stops, departures)
+
+    with stage("version"):
+        version = SNAPSHOTS.add(key, result)
+
+    with stage("serialize"):
+        if (base := request.json.get("version")) is not None and (
+            changes := get_changes(key, base, result)
+        ) is not None:
+            return JSON({**changes, "base": base, "version": version})
+
+        return JSON({**result.to_json(), "version": version})
+
+
+def get_departures_or_snapshot(
+    address: Address, stops: Optional[int], departures: Optional[int]
+) -> Stops:
+    """Return the departures or, if the upstream API fails,
+    the departures from the offline snapshot, if available.
+
+    Errors of the request itself (status < 500) are not masked.
+    """
+
+    try:
+        return get_departures(address, stops=stops, departures=departures)
+    except Exception as error:
+        if isinstance(error, Error) and error.status < 500:
+            raise
+
+        if (
+            snapshot := get_snapshot(str(address), stops=stops, departures=departures)
+        ) is None:
+            raise
+
+        LOGGER.exception('Upstream failed for "%s". Using snapshot.', address)
+        return snapshot
+
+
+def get_changes(key: tuple, base: str, stops: Stops) -> Optional[dict]:
+    """Return the changes since the given version, if they can be determined."""
+
+    if (previous := SNAPSHOTS.get(key, base)) is None:
+        return None
 
-    return JSON(
-        get_departures(
-            get_address(),
-            stops=request.json.get("stops"),
-            departures=request.json.get("departures"),
-        ).to_json()
-    )
+    return diff(previous, stops)
 
 
 def get_address() -> Address:
     """Return the requested address."""
 
-    if address_id := request.json.get("address"):
-        return Address.get(Address.id == address_id)
-
-    if deployment_id := request.json.get("deployment"):
-        deployment = (
-            Deployment.select(cascade=True).where(Deployment.id == deployment_id).get()
-        )
-        return deployment.lpt_address or deployment.address
-
-    return Address(
-        street=request.json["street"],
-        house_number=request.json["houseNumber"],
-        zip_code=request.json["zipCode"],
-        city=request.json["city"],
-        district=request.json.get("district"),
-    )
+    return api.get_address(request.json)
@@ -22,6 +22,7 @@ setup(
         "wsgilib",
     ],
     packages=["lptlib"],
+    entry_points={"console_scripts": ["lptlib = lptlib.cli:main"]},
     license="GPLv3",
     description="General purpose local public transport API.",
 )